@@ -1,10 +1,12 @@
 import configparser
-import copy
+import heapq
 import logging
 import os
 import random
+import struct
 import time
 import zlib
+from collections import deque
 from enum import Enum
 from threading import Thread, Event
 from socket import socket, AF_INET, SOCK_DGRAM, timeout
@@ -22,9 +24,12 @@ class Timeout(Exception):
 
 
 TIMEOUT_NUMBER = 50
-HEADER_SIZE = 1
+PROTOCOL_VERSION = 1
+# Frame header: version | type | seqno | payload length | checksum
+HEADER = struct.Struct("!BcIHI")
+HEADER_SIZE = HEADER.size
 CHECKSUM_SIZE = 4
-INFO_DATA = 20
+CHECKSUM_OFFSET = HEADER_SIZE - CHECKSUM_SIZE
 
 
 class PDUSendStatus(Enum):
@@ -37,29 +42,44 @@ class PDURecStatus(Enum):
 	OK = 'Correct'
 	DataErr = 'Data Error'
 	NoErr = 'Sequential Number Error '
+	Buffered = 'Buffered Out of Order'
+
+
+class ARQMode(Enum):
+	GBN = 'GBN'
+	SR = 'SR'
 
 
 class FrameType(Enum):
-	HANDSHAKE = 'h'
-	START = 's'
-	DATA = 'd'
-	ACK = 'a'
+	HANDSHAKE = b'h'
+	START = b's'
+	DATA = b'd'
+	ACK = b'a'
+
+
+FRAME_TYPES = {frame_type.value: frame_type for frame_type in FrameType}
 
 
 class PDU:
+	__slots__ = ("data", "status", "type", "seqno", "message", "checksum")
+
 	def __init__(self, data: bytes = None):
 		self.data: bytes = data
 		self.status = PDUSendStatus.NEW
 		self.type = None
-		if self.data is not None:
-			self.message = self.data[HEADER_SIZE: -CHECKSUM_SIZE]
-			self.header = self.data[:HEADER_SIZE]
-			self.checksum = self.data[-CHECKSUM_SIZE:]
+		self.seqno = 0
+		self.message = b''
+		self.checksum = None
+		if self.data is not None and len(self.data) >= HEADER_SIZE:
+			# Payload is a view into the received datagram, so parsing doesn't copy it
+			version, frame_type, self.seqno, length, self.checksum = HEADER.unpack_from(self.data)
+			if version == PROTOCOL_VERSION:
+				self.type = FRAME_TYPES.get(frame_type)
+			self.message = memoryview(self.data)[HEADER_SIZE: HEADER_SIZE + length]
 
 	@staticmethod
 	def ACK(seqno: int) -> 'PDU':
-		message = f"{seqno}"
-		return PDU().pack(message, FrameType.ACK)
+		return PDU().pack(b'', FrameType.ACK, seqno)
 
 	@staticmethod
 	def SYNACK(ws: int = None) -> 'PDU':
@@ -73,41 +93,27 @@ class PDU:
 		message = f"{filename}"
 		return PDU().pack(message, FrameType.ACK)
 
-	def get_seqno(self) -> str:
-		if self.type == FrameType.DATA:
-			return self.message.split(b'|', maxsplit=1)[0].decode()
-
-	def calc_checksum(self, data: bytes) -> bytes:
-		return zlib.adler32(data).to_bytes(CHECKSUM_SIZE, byteorder='big')
-
-	def pack(self, data: str | bytes, frame_type: FrameType) -> 'PDU':
-		def make_header():
-			match frame_type:
-				case FrameType.HANDSHAKE:
-					header = FrameType.HANDSHAKE.value.encode()
-				case FrameType.START:
-					header = FrameType.START.value.encode()
-				case FrameType.DATA:
-					header = FrameType.DATA.value.encode()
-				case FrameType.ACK:
-					header = FrameType.ACK.value.encode()
-				case _:
-					raise ValueError(f"Unknown frame type: {frame_type}")
-			self.type = FrameType(header.decode())
-			self.header = header
+	@staticmethod
+	def calc_checksum(header: bytes, message: bytes) -> int:
+		# Covers the header without the checksum field itself
+		return zlib.adler32(message, zlib.adler32(header[:CHECKSUM_OFFSET]))
 
+	def pack(self, data: str | bytes, frame_type: FrameType, seqno: int = 0) -> 'PDU':
 		self.message = data.encode('utf-8') if type(data) is str else data
-		make_header()
-		self.checksum = self.calc_checksum(self.header + self.message)
-		self.data = self.header + self.message + self.checksum
+		self.type = frame_type
+		self.seqno = seqno
+		header = (PROTOCOL_VERSION, frame_type.value, seqno, len(self.message))
+		self.checksum = self.calc_checksum(HEADER.pack(*header, 0), self.message)
+		self.data = HEADER.pack(*header, self.checksum) + self.message
 		return self
 
 	def check(self) -> bool:
-		cal_checksum = self.calc_checksum(self.header + self.message)
-		return cal_checksum == self.checksum
+		if self.type is None or len(self.data) != HEADER_SIZE + len(self.message):
+			return False
+		return self.calc_checksum(memoryview(self.data), self.message) == self.checksum
 
-	def unpack(self) -> tuple[FrameType, bytes]:
-		return FrameType(self.header.decode()), self.message
+	def unpack(self) -> tuple[FrameType, memoryview]:
+		return self.type, self.message
 
 	def noise(self):
 		index_to_change = random.randint(0, len(self.data) - 1)
@@ -125,7 +131,7 @@ class Socket:
 		self.frame_size = framesize
 
 	def recframe(self) -> PDU:
-		data, addr = self.sock.recvfrom(self.frame_size + INFO_DATA)
+		data, addr = self.sock.recvfrom(self.frame_size + HEADER_SIZE)
 		frame = PDU(data)
 		return frame
 
@@ -136,6 +142,117 @@ class Socket:
 		self.sock.close()
 
 
+class RetransmitTimer:
+	# Min-heap of per-frame deadlines in monotonic nanoseconds.
+	# Cancelled or restarted frames leave stale heap entries which are skipped lazily
+	def __init__(self):
+		self.heap: [tuple[int, int]] = []
+		self.deadlines: {int: int} = {}
+
+	def __contains__(self, frame: int) -> bool:
+		return frame in self.deadlines
+
+	def __len__(self) -> int:
+		return len(self.deadlines)
+
+	def start(self, frame: int, timeout: float):
+		deadline = time.monotonic_ns() + int(timeout * 1_000_000_000)
+		self.deadlines[frame] = deadline
+		heapq.heappush(self.heap, (deadline, frame))
+
+	def cancel(self, frame: int):
+		self.deadlines.pop(frame, None)
+
+	def clear(self):
+		self.heap.clear()
+		self.deadlines.clear()
+
+	def earliest(self) -> int | None:
+		while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+			heapq.heappop(self.heap)
+		return self.heap[0][0] if self.heap else None
+
+	def time_left(self) -> float | None:
+		# Seconds until the earliest deadline, None if nothing is in flight
+		deadline = self.earliest()
+		if deadline is None:
+			return None
+		return max(0, deadline - time.monotonic_ns()) / 1_000_000_000
+
+	def expired(self) -> [int]:
+		frames = []
+		now = time.monotonic_ns()
+		while (deadline := self.earliest()) is not None and deadline <= now:
+			frames.append(heapq.heappop(self.heap)[1])
+			self.deadlines.pop(frames[-1])
+		return frames
+
+
+class RTTEstimator:
+	# Retransmission timeout as in RFC 6298: smoothed RTT and its variance are updated
+	# only from frames sent once (Karn's rule), every timeout doubles RTO until the next sample
+	ALPHA = 1 / 8
+	BETA = 1 / 4
+	K = 4
+
+	def __init__(self, initial_rto: float, min_rto: float, max_rto: float):
+		self.min_rto = min_rto
+		self.max_rto = max_rto
+		self.srtt: float | None = None
+		self.rttvar: float | None = None
+		self.rto = self.clamp(initial_rto)
+		self.backoff = 1
+
+	def clamp(self, rto: float) -> float:
+		return min(max(rto, self.min_rto), self.max_rto)
+
+	def sample(self, rtt: float):
+		if self.srtt is None:
+			self.srtt = rtt
+			self.rttvar = rtt / 2
+		else:
+			self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+			self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+		self.backoff = 1
+		self.rto = self.clamp(self.srtt + self.K * self.rttvar)
+
+	def on_timeout(self):
+		self.backoff *= 2
+		self.rto = self.clamp(self.rto * 2)
+
+	def stats(self) -> dict:
+		return {
+			"srtt": self.srtt,
+			"rttvar": self.rttvar,
+			"rto": self.rto,
+			"backoff": self.backoff,
+		}
+
+
+class CongestionWindow:
+	# Number of frames allowed in flight, never above SWSize: slow start doubles it every RTT
+	# up to ssthresh, then it grows by one frame per RTT. Timeout halves ssthresh and starts from one frame
+	def __init__(self, max_window: int):
+		self.max_window = max_window
+		self.cwnd = 1.0
+		self.ssthresh = float(max_window)
+
+	@property
+	def size(self) -> int:
+		return max(1, min(int(self.cwnd), self.max_window))
+
+	def on_ack(self):
+		if self.cwnd < self.ssthresh:
+			self.cwnd += 1
+		else:
+			self.cwnd += 1 / self.cwnd
+		self.cwnd = min(self.cwnd, self.max_window)
+
+	def on_timeout(self):
+		self.ssthresh = max(self.size / 2, 2)
+		self.cwnd = 1.0
+
+
 class Host:
 	def __init__(self,
 		address: tuple[str, int],
@@ -145,14 +262,20 @@ class Host:
 		timer: int,
 		lost_rate: int,
 		error_rate: int,
-		folder: str
+		folder: str,
+		mode: ARQMode = ARQMode.GBN,
+		min_timer: float = 0.01,
+		max_timer: float = 3.0
 	):
 		self.InitSeqNo = init_seqno
 		self.lost_rate = lost_rate
 		self.error_rate = error_rate
 		self.frame_size = data_size
-		self.timer = timer
+		self.timer = timer  # Initial RTO, before the first RTT sample
+		self.min_timer = min_timer
+		self.max_timer = max_timer
 		self.host_folder = folder
+		self.mode = mode
 
 		self.address = address
 		self.ws = ws
@@ -161,60 +284,77 @@ class Host:
 		self.receive_thread = None
 		self.next_seqno: {tuple: int} = {}
 
-	def add_connection(self, host_address: tuple[str, int]):
+	@staticmethod
+	def seq_space(ws: int, mode: ARQMode) -> int:
+		# Selective Repeat needs twice the window to tell new frames from retransmissions
+		return 2 * ws if mode == ARQMode.SR else ws + 1
+
+	def add_connection(self, host_address: tuple[str, int], mode: ARQMode = None):
 		self.connections[host_address] = {
-			"ws": 0,
-			"socket": Socket(self.address, host_address, self.frame_size, self.timer),
-			"GetACK": Event(),
-			"start_time": [0 for _ in range(self.ws + 1)]
+			"mode": mode or self.mode,  # How we send to the peer
+			"ws": 0,  # Peer's window, mode and seqno space, they are announced in handshake
+			"peer_mode": ARQMode.GBN,
+			"seq_space": 0,
+			"acks": deque(),
+			"rtt": RTTEstimator(self.timer, self.min_timer, self.max_timer),
+			"cwnd": CongestionWindow(self.ws),
+			"socket": Socket(self.address, host_address, self.frame_size, self.max_timer),  # Idle limit follows the longest RTO
+			"GetACK": Event()
 		}
 		self.receive_thread = Thread(target=self.receive, args=(host_address,))
 		self.receive_thread.daemon = True
 		self.receive_thread.start()
 
 	def handle_message(self, frame: PDU, sender_address: tuple[str, int]):
-		# handshake: WS
+		# Every frame carries seqno in the header, payloads are:
+		# handshake: WS|mode
 		# start:     filename|file_size
-		# data:      seqno|data
-		# ack:       data ("SYN", seqno)
+		# data:      data
+		# ack:       empty for data ACK, "SYN" for handshake
 		if not frame.check():
 			print(f"Mismatch checksum!")
 			if frame.type in [FrameType.START, FrameType.DATA]:
 				if frame.type == FrameType.START:
 					exp_seqno = 0
-					filename = frame.message.split(b'|', maxsplit=1)[0].decode()
+					filename = bytes(frame.message).split(b'|', maxsplit=1)[0].decode(errors='replace')
+					filename = filename.split(".")[0]
 					if "rec_" + filename not in log_files:
 						print("Couldn't define file name and write in corresponding log file")
 						return
-				else:
+				elif sender_address in self.files:
 					exp_seqno = self.files[sender_address]["seqno"]
 					filename = self.files[sender_address]["filename"]
-				rec_log("rec_" + filename, exp_seqno, frame.get_seqno(), PDURecStatus.DataErr.name)
+				else:
+					return
+				rec_log("rec_" + filename, exp_seqno, frame.seqno, PDURecStatus.DataErr.name)
 			return
 
 		header, message = frame.unpack()
 		match header:
 			case FrameType.ACK:
-				data = message.decode('utf-8')
-				try:
-					data = int(data)
-					# It's Data ACK with seqno
-					if data == self.next_seqno[sender_address]:
-						self.next_seqno[sender_address] += 1
-						self.next_seqno[sender_address] %= (self.ws + 1)
-						while True:
-							if not self.connections[sender_address]['GetACK'].is_set():
-								self.connections[sender_address]['GetACK'].set()
-								break
-				except ValueError:  # It's SYN ACK
+				if message:  # It's SYN ACK
+					self.connections[sender_address]['GetACK'].set()
+				elif self.connections[sender_address]['mode'] == ARQMode.SR:
+					self.connections[sender_address]['acks'].append(frame.seqno)
 					self.connections[sender_address]['GetACK'].set()
+				# It's Data ACK with seqno
+				elif frame.seqno == self.next_seqno[sender_address]:
+					self.next_seqno[sender_address] += 1
+					self.next_seqno[sender_address] %= (self.ws + 1)
+					while True:
+						if not self.connections[sender_address]['GetACK'].is_set():
+							self.connections[sender_address]['GetACK'].set()
+							break
 
 			case FrameType.HANDSHAKE:
-				self.connections[sender_address]['ws'] = int(message.decode())
+				ws, mode = bytes(message).decode().split('|')
+				self.connections[sender_address]['ws'] = int(ws)
+				self.connections[sender_address]['peer_mode'] = ARQMode(mode)
+				self.connections[sender_address]['seq_space'] = self.seq_space(int(ws), ARQMode(mode))
 				self.send_frame(PDU.SYNACK(), sender_address)
 
 			case FrameType.START:
-				filename, file_size = message.split(b'|', 1)
+				filename, file_size = bytes(message).split(b'|', 1)
 				filename, file_size = map(lambda x: x.decode(), (filename, file_size))
 				file_path = os.path.join(os.getcwd(), self.host_folder, filename)
 
@@ -226,7 +366,8 @@ class Host:
 					"file": open(file_path, 'wb'),
 					"size": int(file_size),
 					"seqno": 1,
-					"rec_size": 0
+					"rec_size": 0,
+					"buffer": {}
 				}
 				log_name = "rec_" + filename.split(".")[0]
 				create_new_log(self.host_folder, log_name, False)
@@ -234,26 +375,60 @@ class Host:
 				self.send_frame(PDU.ACK(0), sender_address)
 
 			case FrameType.DATA:
-				seqno, data = message.split(b'|', 1)
-				seqno = int(seqno.decode())
+				seqno, data = frame.seqno, message
+				if self.connections[sender_address]['peer_mode'] == ARQMode.SR:
+					self.handle_data_sr(seqno, data, sender_address)
+					return
 				# We record the data if only we got frame with expected seqno
 				# Otherwise, it's a duplicate
 				if sender_address in self.files.keys() and seqno == self.files[sender_address]["seqno"]:
 					rec_log("rec_" + self.files[sender_address]["filename"], self.files[sender_address]["seqno"],
 							seqno, PDURecStatus.OK.name)
 					self.files[sender_address]["seqno"] += 1
-					self.files[sender_address]["seqno"] %= self.connections[sender_address]['ws']
+					self.files[sender_address]["seqno"] %= self.connections[sender_address]['seq_space']
 					self.files[sender_address]["file"].write(data)
 					self.files[sender_address]["rec_size"] += len(data)
 					if self.files[sender_address]["rec_size"] == self.files[sender_address]["size"]:
 						print(f"Close file")
 						self.files[sender_address]["file"].close()
 						self.files.pop(sender_address)
-				else:
+				elif sender_address in self.files.keys():
 					rec_log("rec_" + self.files[sender_address]["filename"], self.files[sender_address]["seqno"],
 							seqno, PDURecStatus.NoErr.name)
 				self.send_frame(PDU.ACK(seqno), sender_address)
 
+	def handle_data_sr(self, seqno: int, data: memoryview, sender_address: tuple[str, int]):
+		# Frames inside the receive window are buffered until the gap before them is filled,
+		# every frame is acknowledged on its own
+		if sender_address not in self.files.keys():
+			# Data is sent only after START is acknowledged, so it's a duplicate of finished file
+			self.send_frame(PDU.ACK(seqno), sender_address)
+			return
+
+		file = self.files[sender_address]
+		ws, seq_space = self.connections[sender_address]['ws'], self.connections[sender_address]['seq_space']
+		offset = (seqno - file["seqno"]) % seq_space
+		if offset < ws and seqno not in file["buffer"]:
+			status = PDURecStatus.OK if offset == 0 else PDURecStatus.Buffered
+			rec_log("rec_" + file["filename"], file["seqno"], seqno, status.name)
+			file["buffer"][seqno] = data
+		elif offset < ws or offset >= seq_space - ws:
+			# Already received, ACK was lost
+			rec_log("rec_" + file["filename"], file["seqno"], seqno, PDURecStatus.NoErr.name)
+		else:
+			return
+		self.send_frame(PDU.ACK(seqno), sender_address)
+
+		while file["seqno"] in file["buffer"]:
+			data = file["buffer"].pop(file["seqno"])
+			file["file"].write(data)
+			file["rec_size"] += len(data)
+			file["seqno"] = (file["seqno"] + 1) % seq_space
+		if file["rec_size"] == file["size"]:
+			print(f"Close file")
+			file["file"].close()
+			self.files.pop(sender_address)
+
 	def receive(self, host_address: tuple[str, int]):
 		timeouts_number = 0  # If there is no messages for a long time -> Break connection
 		while True:
@@ -267,8 +442,12 @@ class Host:
 					exit()
 				timeouts_number += 1
 
-	def await_ack(self, address: tuple[str, int], passed_time: int = 0):
-		if self.connections[address]['GetACK'].wait(self.timer - passed_time):
+	def rtt_estimates(self, address: tuple[str, int]) -> dict:
+		# Live SRTT/RTTVAR/RTO of the connection, seconds
+		return self.connections[address]['rtt'].stats()
+
+	def await_ack(self, address: tuple[str, int], wait_time: float = None):
+		if self.connections[address]['GetACK'].wait(self.timer if wait_time is None else wait_time):
 			self.connections[address]['GetACK'].clear()
 		else:
 			raise Timeout
@@ -276,7 +455,7 @@ class Host:
 	def send_sync(self, address: tuple[str, int]):
 		if address not in self.connections.keys():
 			raise Exception("No such connection!")
-		frame = PDU().pack(str(self.ws + 1), FrameType.HANDSHAKE)
+		frame = PDU().pack(f"{self.ws}|{self.connections[address]['mode'].value}", FrameType.HANDSHAKE)
 		self.send_frame(frame, address)
 		self.await_ack(address)
 
@@ -286,8 +465,8 @@ class Host:
 				create_new_log(self.host_folder, "send_" + filename, True)
 				seqno = 0
 			else:
-				seqno = frame.get_seqno()
-			send_log("send_" + filename, seqno, frame.status.name, frameNo)
+				seqno = frame.seqno
+			send_log("send_" + filename, seqno, frame.status.name, frameNo, self.connections[addr]['cwnd'].size)
 
 		lost = random.randint(0, self.lost_rate)
 		error = random.randint(0, self.error_rate)
@@ -295,62 +474,132 @@ class Host:
 			# print(f"Lost!")
 			return
 		if error == 0:
-			error_frame = copy.deepcopy(frame)
+			error_frame = PDU(frame.data)
 			error_frame.noise()
 			self.connections[addr]['socket'].send(error_frame)
 			# print(f"Error!")
 		else:
 			self.connections[addr]['socket'].send(frame)
 
+	def make_frame(self, f, i: int, file: str, file_size: int, seq_space: int) -> PDU:
+		if i == 0:
+			return PDU().pack(f"{file}|{file_size}", FrameType.START)
+		f.seek((i - 1) * self.frame_size)
+		data = f.read(self.frame_size)
+		return PDU().pack(data, FrameType.DATA, i % seq_space)
+
 	def send_file(self, file: str, address: tuple[str, int]):
 		# Check existing connection
 		if address not in self.connections.keys():
 			raise Exception("No such connection!")
 
-		# Divide file by frames
+		self.connections[address]['cwnd'] = CongestionWindow(self.ws)
+		if self.connections[address]['mode'] == ARQMode.SR:
+			self.send_file_sr(file, address)
+		else:
+			self.send_file_gbn(file, address)
+		print("Done!")
+
+	def send_file_gbn(self, file: str, address: tuple[str, int]):
+		# Frames are built lazily from the file, only the in-flight window is kept in memory
 		file_size = os.path.getsize(file)
-		start_frame = PDU().pack(f"{file}|{file_size}", FrameType.START)
-		data_chunks = [start_frame]
-		with open(file, "rb") as f:
-			for i in range((file_size + self.frame_size - 1) // self.frame_size):
-				data = f.read(self.frame_size)
-				seqno = (i + 1) % (self.ws + 1)
-				frame_data = PDU().pack(f"{seqno}|".encode() + data, FrameType.DATA)
-				data_chunks.append(frame_data)
+		frames_number = (file_size + self.frame_size - 1) // self.frame_size + 1  # START + DATA frames
+		window: {int: PDU} = {}
+		timer = RetransmitTimer()
+		rtt = self.connections[address]['rtt']
+		cwnd = self.connections[address]['cwnd']
+		sent_at: {int: int} = {}  # Send time of frames which were never retransmitted
 
 		# Go-Back-N
 		wait_frames_ack = 0
 		i = 0
 		self.next_seqno[address] = 0
-		step_back = self.ws
-		while i <= len(data_chunks):
-			try:
-				if i != len(data_chunks):
-					# print(f"Send {i}({i % (self.ws + 1)}) frame out of {len(data_chunks) - 1}")
-					self.send_frame(data_chunks[i], address, file.split(".")[0], i)
-					# Note the time of sending frame
-					self.connections[address]['start_time'][i % (self.ws + 1)] = round(time.time())
-					wait_frames_ack += 1
-					i += 1
-				if wait_frames_ack == self.ws or i == len(data_chunks):
-					seqno = (i - 1) % (self.ws + 1)  # Seqno of the oldest frame we wait for
-					passed_time = round(time.time()) - self.connections[address]['start_time'][seqno]
-					self.await_ack(address, passed_time)
-					# print(f"Get ACK {seqno}")
-					wait_frames_ack -= 1
-					if i == len(data_chunks):
-						step_back -= 1
-					if wait_frames_ack == 0 and i == len(data_chunks):
-						break
-
-			except Timeout:
-				data_chunks[i - step_back].status = PDUSendStatus.TO
-				for k in range(1, step_back):
-					data_chunks[i - k].status = PDUSendStatus.RT
-				i -= step_back
-				wait_frames_ack = 0
-				print(f"Timeout frame!")
-		print("Done!")
+		with open(file, "rb") as f:
+			while i <= frames_number:
+				try:
+					if i != frames_number:
+						if i not in window:
+							window[i] = self.make_frame(f, i, file, file_size, self.seq_space(self.ws, ARQMode.GBN))
+						# print(f"Send {i}({i % (self.ws + 1)}) frame out of {frames_number - 1}")
+						self.send_frame(window[i], address, file.split(".")[0], i)
+						timer.start(i, rtt.rto)
+						if window[i].status == PDUSendStatus.NEW:
+							sent_at[i] = time.monotonic_ns()
+						wait_frames_ack += 1
+						i += 1
+					if wait_frames_ack >= cwnd.size or i == frames_number:
+						# Sleep until the ACK or deadline of the oldest frame we wait for
+						self.await_ack(address, timer.time_left())
+						timer.cancel(i - wait_frames_ack)
+						if i - wait_frames_ack in sent_at:
+							rtt.sample((time.monotonic_ns() - sent_at.pop(i - wait_frames_ack)) / 1_000_000_000)
+						window.pop(i - wait_frames_ack)
+						cwnd.on_ack()
+						wait_frames_ack -= 1
+						if wait_frames_ack == 0 and i == frames_number:
+							break
+
+				except Timeout:
+					# Roll back to the oldest unacknowledged frame, its PDU is still in the window
+					i -= wait_frames_ack
+					window[i].status = PDUSendStatus.TO
+					for k in range(i + 1, i + wait_frames_ack):
+						window[k].status = PDUSendStatus.RT
+					wait_frames_ack = 0
+					timer.clear()
+					sent_at.clear()
+					rtt.on_timeout()
+					cwnd.on_timeout()
+					print(f"Timeout frame!")
+
+	def send_file_sr(self, file: str, address: tuple[str, int]):
+		# Selective Repeat: every frame has its own retransmission deadline
+		connection = self.connections[address]
+		seq_space = self.seq_space(self.ws, ARQMode.SR)
+		file_size = os.path.getsize(file)
+		frames_number = (file_size + self.frame_size - 1) // self.frame_size + 1  # START + DATA frames
+		window: {int: PDU} = {}
+		timer = RetransmitTimer()  # Only for not acknowledged frames
+		rtt = connection['rtt']
+		cwnd = connection['cwnd']
+		sent_at: {int: int} = {}  # Send time of frames which were never retransmitted
+
+		connection['acks'].clear()
+		base = next_frame = 0
+		with open(file, "rb") as f:
+			while base < frames_number:
+				# START has to be acknowledged before data, so the receiver never buffers data of unknown file
+				limit = 1 if base == 0 else min(base + cwnd.size, frames_number)
+				while next_frame < limit:
+					window[next_frame] = self.make_frame(f, next_frame, file, file_size, seq_space)
+					self.send_frame(window[next_frame], address, file.split(".")[0], next_frame)
+					timer.start(next_frame, rtt.rto)
+					sent_at[next_frame] = time.monotonic_ns()
+					next_frame += 1
+
+				if connection['GetACK'].wait(timer.time_left()):
+					connection['GetACK'].clear()
+				while connection['acks']:
+					offset = (connection['acks'].popleft() - base) % seq_space
+					if offset < next_frame - base and base + offset in timer:
+						timer.cancel(base + offset)
+						cwnd.on_ack()
+						if base + offset in sent_at:
+							rtt.sample((time.monotonic_ns() - sent_at.pop(base + offset)) / 1_000_000_000)
+				while base < next_frame and base not in timer:
+					window.pop(base)
+					base += 1
+
+				expired = timer.expired()
+				if expired:
+					rtt.on_timeout()
+					cwnd.on_timeout()
+				for i in expired:
+					window[i].status = PDUSendStatus.TO
+					sent_at.pop(i, None)
+					self.send_frame(window[i], address, file.split(".")[0], i)
+					timer.start(i, rtt.rto)
+					print(f"Timeout frame!")
 
 
 class Connector:
@@ -386,12 +635,16 @@ def create_host(config_file):
 	UDPPort = config.getint('UDPSettings', 'UDPPort')
 	SWSize = config.getint('WindowSettings', 'SWSize')
 	Timeout = config.getint('TimeoutSettings', 'Timeout') / 1000
+	MinTimeout = config.getint('TimeoutSettings', 'MinTimeout', fallback=10) / 1000
+	MaxTimeout = config.getint('TimeoutSettings', 'MaxTimeout', fallback=3000) / 1000
 	LostRate = config.getint('PDUSettings', 'LostRate')
 	ErrorRate = config.getint('PDUSettings', 'ErrorRate')
 	InitSeqNo = config.getint('SequenceSettings', 'InitSeqNo')
 	DataSize = config.getint('PDUSettings', 'DataSize')
+	Mode = ARQMode(config.get('WindowSettings', 'Mode', fallback=ARQMode.GBN.value))
 
-	host = Host(("localhost", UDPPort), SWSize, DataSize, InitSeqNo, Timeout, LostRate, ErrorRate, folder)
+	host = Host(("localhost", UDPPort), SWSize, DataSize, InitSeqNo, Timeout, LostRate, ErrorRate, folder, Mode,
+				MinTimeout, MaxTimeout)
 	return host
 
 
@@ -405,11 +658,12 @@ def host1_script(host):
 	print(time.time() - a)
 
 
-def send_log(filename, seqno, status, ackno):
+def send_log(filename, seqno, status, ackno, cwnd):
 	log_data = {
 		'seqno': seqno,
 		'status': status,
 		'ackno': ackno,
+		'cwnd': cwnd,
 	}
 	log_files[filename].info('', extra=log_data)
 
@@ -434,7 +688,7 @@ def create_new_log(folder, filename, is_send):
 	file_handler = logging.FileHandler(f'{path}.log')
 	file_handler.setLevel(logging.INFO)
 	if is_send:
-		log_format = logging.Formatter('%(asctime)s, pdu_to_send=%(seqno)s, status=%(status)s, ackedNo=%(ackno)s')
+		log_format = logging.Formatter('%(asctime)s, pdu_to_send=%(seqno)s, status=%(status)s, ackedNo=%(ackno)s, cwnd=%(cwnd)s')
 	else:
 		log_format = logging.Formatter('%(asctime)s, pdu_exp=%(exp_seqno)s, pdu_recv=%(rec_seqno)s, status=%(status)s')
 